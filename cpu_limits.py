@@ -0,0 +1,39 @@
+"""
+CPU limits shared by main.py and gunicorn.conf.py.
+"""
+
+import math
+import os
+
+
+def available_cpus() -> int:
+    """
+    CPUs this container may actually use: the affinity mask, capped by the
+    cgroup CPU quota (v2 cpu.max or v1 cfs_quota_us), e.g. 2 vCPUs on a
+    large HF Spaces host.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    
+    quota_files = (
+        ("/sys/fs/cgroup/cpu.max", None),
+        ("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", "/sys/fs/cgroup/cpu/cpu.cfs_period_us"),
+    )
+    for quota_path, period_path in quota_files:
+        try:
+            with open(quota_path) as f:
+                values = f.read().split()
+            if period_path:
+                with open(period_path) as f:
+                    values.append(f.read().strip())
+        except OSError:
+            continue
+        
+        quota, period = values[0], values[1]
+        if quota not in ("max", "-1"):
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+        break
+    
+    return cpus
@@ -1,38 +1,81 @@
 """
 Script to pre-download the Sentence Transformer model during Docker build.
 This ensures the model is cached and doesn't need to be downloaded at runtime.
+
+The model is also exported to ONNX and dynamically quantized to INT8
+(AVX512-VNNI) so the production image ships with the quantized weights.
 """
 
 from sentence_transformers import SentenceTransformer
+from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+from optimum.onnxruntime.configuration import AutoQuantizationConfig
 import os
+import re
 
 # Using multilingual model for Indonesian language support
 # paraphrase-multilingual-MiniLM-L12-v2 supports 50+ languages including Indonesian
 MODEL_NAME = "paraphrase-multilingual-MiniLM-L12-v2"
 CACHE_DIR = os.environ.get("TRANSFORMERS_CACHE", "/app/models")
 
+# Hub commit SHA to download, so every image build caches the same snapshot.
+# Set via the Dockerfile's MODEL_REVISION build arg; branches/tags are rejected.
+MODEL_REVISION = os.environ.get("MODEL_REVISION", "")
+
+# Local model directory holding the sentence-transformers config + quantized ONNX file
+MODEL_PATH = os.path.join(CACHE_DIR, MODEL_NAME)
+ONNX_FILE_NAME = "onnx/model_qint8_avx512_vnni.onnx"
+
 def download_model():
-    """Download and cache the sentence transformer model."""
+    """Download the model, export it to quantized ONNX and verify it loads."""
+    if not re.fullmatch(r"[0-9a-f]{40}", MODEL_REVISION):
+        raise SystemExit(
+            f"MODEL_REVISION must be a 40-character commit SHA, got {MODEL_REVISION!r}. "
+            f"Look it up with: huggingface_hub.model_info("
+            f"'sentence-transformers/{MODEL_NAME}').sha"
+        )
+
     print(f"Downloading model: {MODEL_NAME}")
+    print(f"Revision: {MODEL_REVISION}")
     print(f"Cache directory: {CACHE_DIR}")
-    
-    # Download the model (will be cached automatically)
-    model = SentenceTransformer(MODEL_NAME, cache_folder=CACHE_DIR)
-    
+
+    # Download the model (will be cached automatically) and save a local copy
+    # with modules.json, pooling config and tokenizer next to the ONNX file
+    model = SentenceTransformer(MODEL_NAME, cache_folder=CACHE_DIR, revision=MODEL_REVISION)
+    model.save(MODEL_PATH)
+
+    # Export to ONNX and quantize weights to INT8 (dynamic quantization)
+    print("Exporting model to ONNX and quantizing (avx512_vnni)...")
+    ort_model = ORTModelForFeatureExtraction.from_pretrained(MODEL_PATH, export=True)
+    quantizer = ORTQuantizer.from_pretrained(ort_model)
+    quantizer.quantize(
+        save_dir=os.path.join(MODEL_PATH, "onnx"),
+        quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False),
+        file_suffix="qint8_avx512_vnni",
+    )
+
+    # Load the quantized model exactly like the service does
+    model = SentenceTransformer(
+        MODEL_PATH,
+        backend="onnx",
+        model_kwargs={"file_name": ONNX_FILE_NAME, "provider": "CPUExecutionProvider"},
+        local_files_only=True,
+    )
+
     # Test the model with sample texts in Indonesian and English
     test_texts = [
         "Test sentence for model verification",
         "Kos nyaman dekat kampus dengan WiFi dan AC",
         "Rumah kost murah di Jakarta Selatan"
     ]
-    
+
     for text in test_texts:
         embedding = model.encode(text)
         print(f"Text: '{text[:40]}...' -> Dimension: {len(embedding)}")
-    
+
     print(f"\nModel downloaded successfully!")
     print(f"Embedding dimension: {len(embedding)}")
-    
+    print(f"Quantized ONNX model: {os.path.join(MODEL_PATH, ONNX_FILE_NAME)}")
+
     return model
 
 if __name__ == "__main__":
@@ -0,0 +1,65 @@
+"""
+Gunicorn configuration for production.
+
+Runs several Uvicorn worker processes so CPU-bound encoding scales past the
+GIL. Each worker loads its own encoder in the FastAPI lifespan, using
+TORCH_NUM_THREADS threads, so workers x threads matches the available cores.
+"""
+
+import os
+import sys
+
+# Config file is loaded by path; make the app directory importable for cpu_limits
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cpu_limits import available_cpus
+
+TORCH_NUM_THREADS = int(os.environ.get("TORCH_NUM_THREADS", "2"))
+CPU_COUNT = available_cpus()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '7860')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.environ.get("WEB_CONCURRENCY", max(1, CPU_COUNT // TORCH_NUM_THREADS)))
+
+# Model load + warm-up runs per worker before it serves requests
+timeout = 120
+
+
+# Core-group slot held by each live worker, keyed by worker.age (arbiter side)
+_cpu_slots = {}
+
+
+def pre_fork(server, worker):
+    """Give the new worker the lowest core-group slot not held by a live worker."""
+    taken = set(_cpu_slots.values())
+    slot = next(i for i in range(len(taken) + 1) if i not in taken)
+    _cpu_slots[worker.age] = slot
+    # Set before fork, so the child sees it in post_fork
+    worker.cpu_slot = slot
+
+
+def child_exit(server, worker):
+    """Release the exited worker's slot so its respawn reuses the same cores."""
+    _cpu_slots.pop(worker.age, None)
+
+
+def post_fork(server, worker):
+    """
+    Pin each worker process to the core group of its slot.
+    
+    Only when the affinity mask is the binding CPU limit: under a cgroup quota
+    (e.g. 2 vCPUs on a 64-core host) the mask still lists every host core, so
+    pinning would pile every replica onto host cores 0..K. There the
+    TORCH_NUM_THREADS caps alone bound CPU use.
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        return
+    
+    cores = sorted(os.sched_getaffinity(0))
+    if CPU_COUNT != len(cores):
+        return
+    
+    start = worker.cpu_slot * TORCH_NUM_THREADS
+    os.sched_setaffinity(
+        0, {cores[(start + i) % len(cores)] for i in range(TORCH_NUM_THREADS)}
+    )
@@ -6,28 +6,346 @@ Endpoints:
 - GET /health - Health check
 - POST /vectorize - Generate embedding for single text
 - POST /vectorize/batch - Generate embeddings for multiple texts
+- POST /vectorize/batch/stream - Stream embeddings for multiple texts as NDJSON
 
 Model: paraphrase-multilingual-MiniLM-L12-v2
 - Supports 50+ languages including Indonesian
 - Output dimension: 384
+- Backend: ONNX Runtime with INT8 (AVX512-VNNI) quantized weights
+  (MODEL_BACKEND=torch switches to PyTorch + torch.compile)
 """
 
+import asyncio
+import base64
+import hashlib
+import math
 import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
-from typing import List
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from typing import Annotated, List, Literal, Optional, Union
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse, StreamingResponse
+import numpy as np
+import orjson
+from pydantic import BaseModel, Field, StringConstraints
 from sentence_transformers import SentenceTransformer
+import onnxruntime
+import torch
+
+from cpu_limits import available_cpus
 
 # Configuration
 MODEL_NAME = "paraphrase-multilingual-MiniLM-L12-v2"
 CACHE_DIR = os.environ.get("TRANSFORMERS_CACHE", "/app/models")
 EMBEDDING_DIMENSION = 384  # Output dimension for multilingual-MiniLM-L12-v2
 
+# Local model directory prepared by download_model.py (config + quantized ONNX)
+MODEL_PATH = os.path.join(CACHE_DIR, MODEL_NAME)
+ONNX_FILE_NAME = "onnx/model_qint8_avx512_vnni.onnx"
+
+# Inference backend: "onnx" (quantized, default) or "torch" (FP32, torch.compile)
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "onnx")
+MODEL_BACKENDS = ("onnx", "torch")
+
+# Cap torch threads so concurrent encodes don't oversubscribe CPU cores
+TORCH_NUM_THREADS = int(os.environ.get("TORCH_NUM_THREADS", "2"))
+torch.set_num_threads(TORCH_NUM_THREADS)
+torch.set_num_interop_threads(1)
+
+# Same cap for the ONNX Runtime session that actually runs the encoder
+onnx_session_options = onnxruntime.SessionOptions()
+onnx_session_options.intra_op_num_threads = TORCH_NUM_THREADS
+onnx_session_options.inter_op_num_threads = 1
+
+# Micro-batching for single-text requests
+MAX_BATCH = int(os.environ.get("MAX_BATCH", "32"))
+MAX_WAIT_MS = float(os.environ.get("MAX_WAIT_MS", "5"))
+
+# Max padded tokens (sub-batch size x longest sequence) per forward pass.
+# Short queries pack into large sub-batches, long descriptions into small ones.
+TOKEN_BUDGET = int(os.environ.get("TOKEN_BUDGET", "8192"))
+
+# Output dtypes selectable via ?dtype= and encodings via ?format=
+VectorDType = Literal["fp32", "fp16", "int8"]
+VectorFormat = Literal["json", "b64"]
+NUMPY_DTYPES = {"fp32": np.float32, "fp16": np.float16, "int8": np.int8}
+
+# Vectors are L2-normalized, so int8 output is round(v * 127); float value = int8 * scale
+INT8_SCALE = 1 / 127
+
+# Max number of texts kept in the exact-match embedding cache (0 disables it)
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", "10000"))
+
+# Origin allowed by CORS (no credentials, so "*" is safe for this read-only API)
+CORS_ALLOW_ORIGIN = os.environ.get("CORS_ALLOW_ORIGIN", "*")
+
+# CPUs this process may use (affinity mask capped by the cgroup CPU quota)
+CPU_COUNT = available_cpus()
+
+# Encode threads: one per group of TORCH_NUM_THREADS usable CPUs
+ENCODE_WORKERS = int(os.environ.get(
+    "ENCODE_WORKERS", max(1, math.ceil(CPU_COUNT / TORCH_NUM_THREADS))
+))
+
 # Global model storage
 ml_models: dict = {}
 
+# Queue of (text, Future) pairs consumed by the micro-batcher
+encode_queue: Optional[asyncio.Queue] = None
+
+
+# ============================================================
+# Encode Executor
+# ============================================================
+
+def create_encode_executor() -> ThreadPoolExecutor:
+    """
+    Bounded pool for asyncio.to_thread() encode work, created per lifespan.
+    
+    Threads are not pinned: ONNX Runtime builds its intra-op thread pool with
+    the session, so pinning the calling threads would not move the pool's
+    threads. Only gunicorn.conf.py pins, per worker process, and only when
+    the affinity mask is the CPU limit; under plain uvicorn nothing is pinned.
+    """
+    return ThreadPoolExecutor(max_workers=ENCODE_WORKERS, thread_name_prefix="enc")
+
+
+# ============================================================
+# Embedding Cache
+# ============================================================
+
+class EmbeddingCache:
+    """
+    Exact-match LRU cache of embeddings, keyed by a BLAKE2b hash of the text.
+    
+    Vectors are kept as float32 (about 1.5 KB each, ~15 MB at the default
+    size) so cached and fresh responses are bit-identical and still unit-norm.
+    The cache is only touched from the event loop, so it needs no locking.
+    """
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+    
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+    
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Return the cached vector for text, or None on a miss."""
+        key = self._key(text)
+        vector = self._entries.get(key)
+        if vector is None:
+            return None
+        self._entries.move_to_end(key)
+        return vector
+    
+    def put(self, text: str, vector: np.ndarray) -> np.ndarray:
+        """Cache vector for text and return it unchanged."""
+        if self.max_size <= 0:
+            return vector
+        
+        # Own copy: vector is usually a row view that would pin its whole batch
+        stored = np.array(vector, dtype=np.float32)
+        key = self._key(text)
+        self._entries[key] = stored
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return stored
+    
+    def clear(self):
+        self._entries.clear()
+
+
+embedding_cache = EmbeddingCache(EMBEDDING_CACHE_SIZE)
+
+
+# ============================================================
+# Encoding Helpers
+# ============================================================
+
+def plan_sub_batches(lengths: List[int]) -> List[List[int]]:
+    """
+    Group text indices longest-first into sub-batches whose padded size
+    (len(sub_batch) * longest length in it) stays within TOKEN_BUDGET.
+    """
+    order = sorted(range(len(lengths)), key=lengths.__getitem__, reverse=True)
+    sub_batches: List[List[int]] = []
+    current: List[int] = []
+    
+    for index in order:
+        # Sorted longest-first, so the first item sets the sub-batch's padded length
+        longest = lengths[current[0]] if current else lengths[index]
+        if current and (len(current) + 1) * longest > TOKEN_BUDGET:
+            sub_batches.append(current)
+            current = []
+        current.append(index)
+    
+    if current:
+        sub_batches.append(current)
+    return sub_batches
+
+
+def tokenize_texts(texts: List[str]):
+    """Tokenize texts once without padding; returns (encodings, token counts)."""
+    encoder = ml_models["encoder"]
+    tokenized = encoder.tokenizer(
+        texts, truncation="longest_first", max_length=encoder.max_seq_length
+    )
+    lengths = [len(ids) for ids in tokenized["input_ids"]]
+    return tokenized, lengths
+
+
+def encode_sub_batch(tokenized, sub_batch: List[int]) -> np.ndarray:
+    """
+    Pad one sub-batch only to its own longest text and run it through the
+    model's modules (transformer + pooling). Returns L2-normalized vectors,
+    rows in sub_batch order.
+    """
+    encoder = ml_models["encoder"]
+    features = encoder.tokenizer.pad(
+        {key: [values[i] for i in sub_batch] for key, values in tokenized.items()},
+        return_tensors="pt",
+    )
+    with torch.inference_mode():
+        embeddings = encoder.forward(dict(features))["sentence_embedding"]
+        # L2-normalize in place so cosine similarity downstream is a plain dot product
+        embeddings /= embeddings.norm(p=2, dim=1, keepdim=True).clamp_min(1e-12)
+    # Zero-copy view of the model's own output tensor
+    return embeddings.cpu().numpy()
+
+
+def encode_texts(texts: List[str]) -> np.ndarray:
+    """
+    Encode texts with minimal padding: tokenize once, then encode length-sorted
+    sub-batches under TOKEN_BUDGET.
+    
+    Returns vectors aligned with the input: vectors[i] corresponds to texts[i].
+    """
+    tokenized, lengths = tokenize_texts(texts)
+    
+    vectors = np.empty((len(texts), EMBEDDING_DIMENSION), dtype=np.float32)
+    for sub_batch in plan_sub_batches(lengths):
+        vectors[sub_batch] = encode_sub_batch(tokenized, sub_batch)
+    
+    return vectors
+
+
+def cast_vectors(vectors: np.ndarray, dtype: str) -> np.ndarray:
+    """Cast normalized float32 vectors to the requested output dtype."""
+    if dtype == "int8":
+        return np.round(vectors / INT8_SCALE).astype(np.int8)
+    return vectors.astype(NUMPY_DTYPES[dtype], copy=False)
+
+
+def json_array(vectors: np.ndarray) -> np.ndarray:
+    """
+    Prepare vectors for orjson's native numpy serialization (no .tolist()).
+    float16 is widened to float32; the values stay fp16-rounded.
+    """
+    if vectors.dtype == np.float16:
+        return vectors.astype(np.float32)
+    return vectors
+
+
+def encode_b64(array: np.ndarray) -> str:
+    """Base64-encode the raw (C-order) bytes of a numpy array."""
+    return base64.b64encode(np.ascontiguousarray(array).tobytes()).decode("ascii")
+
+
+# ============================================================
+# Micro-batcher
+# ============================================================
+
+async def batcher(queue: asyncio.Queue):
+    """
+    Coalesce single-text requests arriving within MAX_WAIT_MS into one
+    encode() call (up to MAX_BATCH texts) and resolve each request's future.
+    """
+    loop = asyncio.get_running_loop()
+    
+    while True:
+        items = [await queue.get()]
+        deadline = loop.time() + MAX_WAIT_MS / 1000
+        
+        while len(items) < MAX_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        
+        # Skip requests that were cancelled while waiting (client disconnected)
+        items = [(text, fut) for text, fut in items if not fut.done()]
+        if not items:
+            continue
+        
+        try:
+            vectors = await asyncio.to_thread(
+                encode_texts, [text for text, _ in items]
+            )
+        except Exception as e:
+            for _, fut in items:
+                if not fut.done():
+                    fut.set_exception(e)
+            continue
+        
+        for (_, fut), vector in zip(items, vectors):
+            if not fut.done():
+                fut.set_result(vector)
+
+
+# ============================================================
+# Model Loading
+# ============================================================
+
+def load_encoder() -> SentenceTransformer:
+    """
+    Load the encoder for MODEL_BACKEND from the local model directory.
+    Never contacts the Hugging Face Hub (local_files_only).
+    """
+    if MODEL_BACKEND not in MODEL_BACKENDS:
+        raise ValueError(
+            f"Unsupported MODEL_BACKEND {MODEL_BACKEND!r}; expected one of {MODEL_BACKENDS}"
+        )
+    
+    if MODEL_BACKEND == "onnx":
+        return SentenceTransformer(
+            MODEL_PATH,
+            backend="onnx",
+            model_kwargs={
+                "file_name": ONNX_FILE_NAME,
+                "provider": "CPUExecutionProvider",
+                "session_options": onnx_session_options,
+            },
+            cache_folder=CACHE_DIR,
+            local_files_only=True,
+        )
+    
+    encoder = SentenceTransformer(
+        MODEL_PATH, backend="torch", cache_folder=CACHE_DIR, local_files_only=True
+    )
+    encoder.eval()
+    # Fuse transformer kernels with Inductor; dynamic shapes avoid a recompile per length
+    encoder[0].auto_model = torch.compile(encoder[0].auto_model, dynamic=True)
+    return encoder
+
+
+def warm_up_encoder():
+    """
+    Encode representative shapes (single short text, medium batch, full batch
+    of max-length texts) so kernels, thread pools and scratch memory are
+    ready before the first request.
+    """
+    for text, count in (("warm", 1), ("a " * 64, 8), ("a " * 256, 32)):
+        encode_texts([text] * count)
+
 
 # ============================================================
 # Lifespan Context Manager (Modern Startup/Shutdown)
@@ -39,14 +357,25 @@ async def lifespan(app: FastAPI):
     Modern lifespan handler for FastAPI.
     Replaces deprecated @app.on_event("startup") and @app.on_event("shutdown")
     """
+    global encode_queue
+    
     # Startup: Load model
     print("=" * 50)
     print("Kosera AI Service Starting...")
     print(f"Loading model: {MODEL_NAME}")
     print(f"Cache directory: {CACHE_DIR}")
+    print(f"Backend: {MODEL_BACKEND}")
+    if MODEL_BACKEND == "onnx":
+        print(f"ONNX model file: {ONNX_FILE_NAME}")
+    
+    # Route asyncio.to_thread() through the bounded encode pool
+    encode_executor = create_encode_executor()
+    asyncio.get_running_loop().set_default_executor(encode_executor)
     
     try:
-        ml_models["encoder"] = SentenceTransformer(MODEL_NAME, cache_folder=CACHE_DIR)
+        ml_models["encoder"] = load_encoder()
+        # Warm up on an encode thread, off the event loop
+        await asyncio.to_thread(warm_up_encoder)
         print(f"Model loaded successfully!")
         print(f"Embedding dimension: {EMBEDDING_DIMENSION}")
         print("=" * 50)
@@ -55,10 +384,22 @@ async def lifespan(app: FastAPI):
         # Let container fail so orchestrator can restart it
         raise
     
+    # Start micro-batcher for /vectorize
+    encode_queue = asyncio.Queue()
+    batcher_task = asyncio.create_task(batcher(encode_queue))
+    
     yield  # Application runs here
     
     # Shutdown: Cleanup
     print("Kosera AI Service Shutting Down...")
+    batcher_task.cancel()
+    try:
+        await batcher_task
+    except asyncio.CancelledError:
+        pass
+    encode_queue = None
+    embedding_cache.clear()
+    encode_executor.shutdown(wait=False, cancel_futures=True)
     ml_models.clear()
     print("Model unloaded.")
 
@@ -68,31 +409,67 @@ app = FastAPI(
     title="Kosera AI Service",
     description="Text embedding service for semantic search in Kosera SPK",
     version="1.1.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# CORS middleware (for development)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# ============================================================
+# CORS Middleware
+# ============================================================
+
+class SimpleCORSMiddleware:
+    """
+    Minimal pure-ASGI CORS for a credential-less API: appends fixed
+    Access-Control-* headers to every HTTP response and answers preflight
+    OPTIONS requests with 204 without reaching the app.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+        self.headers = [
+            (b"access-control-allow-origin", CORS_ALLOW_ORIGIN.encode("latin-1")),
+            (b"access-control-allow-methods", b"GET, POST, OPTIONS"),
+            (b"access-control-allow-headers", b"*"),
+        ]
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        if scope["method"] == "OPTIONS":
+            await send({"type": "http.response.start", "status": 204, "headers": self.headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + self.headers
+            await send(message)
+        
+        await self.app(scope, receive, send_with_cors)
+
+
+app.add_middleware(SimpleCORSMiddleware)
 
 
 # ============================================================
 # Request/Response Models
 # ============================================================
 
+# Stripped at parse time; empty or whitespace-only text is rejected with 400
+# (see empty_text_exception_handler)
+NonEmptyText = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
+
+
 class TextRequest(BaseModel):
     """Request model for single text vectorization."""
-    text: str = Field(..., min_length=1, description="Text to vectorize")
+    text: NonEmptyText = Field(..., description="Text to vectorize")
 
 
 class BatchTextRequest(BaseModel):
     """Request model for batch text vectorization."""
-    texts: List[str] = Field(
+    texts: List[NonEmptyText] = Field(
         ..., 
         min_length=1, 
         max_length=100, 
@@ -105,6 +482,7 @@ class VectorResponse(BaseModel):
     status: str = "success"
     vector: List[float]
     dimension: int = EMBEDDING_DIMENSION
+    scale: Optional[float] = None  # Set for dtype=int8: float value = int8 value * scale
 
 
 class BatchVectorResponse(BaseModel):
@@ -113,6 +491,29 @@ class BatchVectorResponse(BaseModel):
     vectors: List[List[float]]
     count: int
     dimension: int = EMBEDDING_DIMENSION
+    scale: Optional[float] = None  # Set for dtype=int8: float value = int8 value * scale
+
+
+class EncodedVectorResponse(BaseModel):
+    """Response model for single vector as base64 raw bytes (?format=b64)."""
+    status: str = "success"
+    vector_b64: str
+    dtype: str
+    dimension: int = EMBEDDING_DIMENSION
+    scale: Optional[float] = None  # Set for dtype=int8: float value = int8 value * scale
+
+
+class EncodedBatchVectorResponse(BaseModel):
+    """
+    Response model for batch vectors as base64 raw bytes (?format=b64).
+    Decodes to a row-major (count, dimension) array of the given dtype.
+    """
+    status: str = "success"
+    vectors_b64: str
+    dtype: str
+    count: int
+    dimension: int = EMBEDDING_DIMENSION
+    scale: Optional[float] = None  # Set for dtype=int8: float value = int8 value * scale
 
 
 class HealthResponse(BaseModel):
@@ -123,6 +524,38 @@ class HealthResponse(BaseModel):
     ready: bool
 
 
+# ============================================================
+# Exception Handlers
+# ============================================================
+
+@app.exception_handler(RequestValidationError)
+async def empty_text_exception_handler(request: Request, exc: RequestValidationError):
+    """
+    Keep the 400 responses clients rely on for empty texts, which are now
+    rejected at parse time by NonEmptyText. Same {"detail": ...} shape as
+    HTTPException; other validation errors keep FastAPI's default 422.
+    """
+    for error in exc.errors():
+        if error.get("type") != "string_too_short":
+            continue
+        
+        loc = tuple(error.get("loc", ()))
+        if loc == ("body", "text"):
+            return ORJSONResponse(
+                status_code=400,
+                content={"detail": "Text cannot be empty or whitespace only"}
+            )
+        if len(loc) == 3 and loc[:2] == ("body", "texts") and isinstance(loc[2], int):
+            return ORJSONResponse(
+                status_code=400,
+                content={
+                    "detail": f"Item at index {loc[2]} is empty. All batch items must be valid non-empty text."
+                }
+            )
+    
+    return await request_validation_exception_handler(request, exc)
+
+
 # ============================================================
 # Endpoints
 # ============================================================
@@ -147,34 +580,55 @@ def health_check():
     )
 
 
-@app.post("/vectorize", response_model=VectorResponse)
-def generate_vector(payload: TextRequest):
+@app.post("/vectorize", response_model=Union[VectorResponse, EncodedVectorResponse])
+async def generate_vector(
+    payload: TextRequest,
+    dtype: VectorDType = "fp32",
+    response_format: VectorFormat = Query("json", alias="format"),
+):
     """
     Generate embedding vector for a single text.
     
     The model (paraphrase-multilingual-MiniLM-L12-v2) outputs a 384-dimensional 
     vector that captures the semantic meaning of the input text.
     Supports Indonesian and 50+ other languages.
+    
+    Vectors are L2-normalized, so cosine similarity equals the dot product.
+    
+    Use ?dtype=fp16 to halve precision, ?dtype=int8 for int8 values (multiply
+    by the returned "scale" to recover floats) and ?format=b64 to receive the
+    raw vector bytes base64-encoded instead of a JSON array.
     """
     if "encoder" not in ml_models:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
     try:
-        text = payload.text.strip()
-        if not text:
-            raise HTTPException(
-                status_code=400, 
-                detail="Text cannot be empty or whitespace only"
-            )
+        text = payload.text
+        vector = embedding_cache.get(text)
+        if vector is None:
+            # Enqueue for the micro-batcher; concurrent requests share one encode() call
+            future = asyncio.get_running_loop().create_future()
+            await encode_queue.put((text, future))
+            vector = embedding_cache.put(text, await future)
         
-        # Generate embedding (CPU-based, fast for short texts)
-        vector_embedding = ml_models["encoder"].encode(text).tolist()
+        vector = cast_vectors(vector, dtype)
+        scale = INT8_SCALE if dtype == "int8" else None
+        if response_format == "b64":
+            return EncodedVectorResponse(
+                status="success",
+                vector_b64=encode_b64(vector),
+                dtype=dtype,
+                dimension=len(vector),
+                scale=scale
+            )
         
-        return VectorResponse(
-            status="success",
-            vector=vector_embedding,
-            dimension=len(vector_embedding)
-        )
+        # ndarray is serialized directly by orjson (shape documented by VectorResponse)
+        return ORJSONResponse({
+            "status": "success",
+            "vector": json_array(vector),
+            "dimension": len(vector),
+            "scale": scale,
+        })
     except HTTPException:
         raise
     except Exception as e:
@@ -184,8 +638,15 @@ def generate_vector(payload: TextRequest):
         )
 
 
-@app.post("/vectorize/batch", response_model=BatchVectorResponse)
-def generate_vectors_batch(payload: BatchTextRequest):
+@app.post(
+    "/vectorize/batch",
+    response_model=Union[BatchVectorResponse, EncodedBatchVectorResponse]
+)
+async def generate_vectors_batch(
+    payload: BatchTextRequest,
+    dtype: VectorDType = "fp32",
+    response_format: VectorFormat = Query("json", alias="format"),
+):
     """
     Generate embedding vectors for multiple texts in a single request.
     
@@ -194,30 +655,62 @@ def generate_vectors_batch(payload: BatchTextRequest):
     This ensures the returned vectors array matches the input texts array 1:1.
     
     Maximum 100 texts per request.
+    
+    Supports the same ?dtype= and ?format= options as /vectorize.
     """
     if "encoder" not in ml_models:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
     try:
-        # CRITICAL: Validate all texts to maintain index alignment
-        # Do NOT filter out empty texts as it would misalign the response
-        for index, text in enumerate(payload.texts):
-            if not text.strip():
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Item at index {index} is empty. All batch items must be valid non-empty text."
-                )
+        # Texts are already stripped and non-empty (validated by BatchTextRequest)
+        # Deduplicate so repeated texts are looked up / encoded only once
+        # (plain dict: keeps texts exact, unlike a fixed-width numpy string array)
+        unique_texts = list(dict.fromkeys(payload.texts))
+        position = {text: index for index, text in enumerate(unique_texts)}
+        inverse = [position[text] for text in payload.texts]
         
+        # Already batched: bypasses the micro-batcher queue
         # Generate embeddings in batch (much faster than individual calls)
+        unique_vectors = np.empty((len(unique_texts), EMBEDDING_DIMENSION), dtype=np.float32)
+        misses = []
+        for index, text in enumerate(unique_texts):
+            cached = embedding_cache.get(text)
+            if cached is None:
+                misses.append(index)
+            else:
+                unique_vectors[index] = cached
+        
+        # Only texts missing from the cache go through the encoder
+        if misses:
+            encoded = await asyncio.to_thread(
+                encode_texts, [unique_texts[i] for i in misses]
+            )
+            for index, vector in zip(misses, encoded):
+                unique_vectors[index] = embedding_cache.put(unique_texts[index], vector)
+        
         # Index alignment is preserved: vectors[i] corresponds to texts[i]
-        vectors = ml_models["encoder"].encode(payload.texts).tolist()
+        vectors = unique_vectors[inverse]
         
-        return BatchVectorResponse(
-            status="success",
-            vectors=vectors,
-            count=len(vectors),
-            dimension=EMBEDDING_DIMENSION
-        )
+        vectors = cast_vectors(vectors, dtype)
+        scale = INT8_SCALE if dtype == "int8" else None
+        if response_format == "b64":
+            return EncodedBatchVectorResponse(
+                status="success",
+                vectors_b64=encode_b64(vectors),
+                dtype=dtype,
+                count=len(vectors),
+                dimension=EMBEDDING_DIMENSION,
+                scale=scale
+            )
+        
+        # ndarray is serialized directly by orjson (shape documented by BatchVectorResponse)
+        return ORJSONResponse({
+            "status": "success",
+            "vectors": json_array(vectors),
+            "count": len(vectors),
+            "dimension": EMBEDDING_DIMENSION,
+            "scale": scale,
+        })
     except HTTPException:
         raise
     except Exception as e:
@@ -227,6 +720,58 @@ def generate_vectors_batch(payload: BatchTextRequest):
         )
 
 
+@app.post("/vectorize/batch/stream")
+async def generate_vectors_stream(payload: BatchTextRequest, dtype: VectorDType = "fp32"):
+    """
+    Stream embedding vectors for multiple texts as NDJSON, one line per text:
+    {"index": i, "vector_b64": "..."}
+    
+    Lines are emitted as soon as each sub-batch is encoded (cached texts
+    first, then longest texts first), so use "index" to align vectors with
+    the input texts. If encoding fails mid-stream, a final {"error": "..."}
+    line is written. With ?dtype=int8, float value = int8 value * (1/127).
+    
+    Maximum 100 texts per request.
+    """
+    if "encoder" not in ml_models:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    
+    texts = payload.texts
+    
+    def vector_line(index: int, vector: np.ndarray) -> bytes:
+        vector_b64 = encode_b64(cast_vectors(vector, dtype))
+        return orjson.dumps({"index": index, "vector_b64": vector_b64}) + b"\n"
+    
+    async def stream():
+        misses = []
+        for index, text in enumerate(texts):
+            cached = embedding_cache.get(text)
+            if cached is None:
+                misses.append(index)
+            else:
+                yield vector_line(index, cached)
+        
+        if not misses:
+            return
+        
+        try:
+            tokenized, lengths = await asyncio.to_thread(
+                tokenize_texts, [texts[i] for i in misses]
+            )
+            for sub_batch in plan_sub_batches(lengths):
+                vectors = await asyncio.to_thread(encode_sub_batch, tokenized, sub_batch)
+                for position, vector in zip(sub_batch, vectors):
+                    index = misses[position]
+                    yield vector_line(index, embedding_cache.put(texts[index], vector))
+        except Exception as e:
+            yield orjson.dumps(
+                {"error": f"Batch embedding generation failed: {str(e)}"}
+            ) + b"\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 # ============================================================
 # Run with: uvicorn main:app --host 0.0.0.0 --port 8000
+# Production: gunicorn main:app -c gunicorn.conf.py
 # ============================================================
@@ -0,0 +1,87 @@
+"""
+Token-budgeted sub-batching used by every encode path.
+"""
+
+import random
+
+import numpy as np
+import torch
+
+import main
+
+
+def check_plan(lengths, budget):
+    sub_batches = main.plan_sub_batches(lengths)
+    
+    # Every index appears exactly once
+    flat = [index for sub_batch in sub_batches for index in sub_batch]
+    assert sorted(flat) == list(range(len(lengths)))
+    
+    # Padded size stays within budget, unless it is a single oversize text
+    for sub_batch in sub_batches:
+        longest = max(lengths[i] for i in sub_batch)
+        assert len(sub_batch) * longest <= budget or len(sub_batch) == 1
+
+
+def test_plan_sub_batches_respects_budget(monkeypatch):
+    monkeypatch.setattr(main, "TOKEN_BUDGET", 64)
+    rng = random.Random(0)
+    
+    for _ in range(200):
+        lengths = [rng.randint(1, 80) for _ in range(rng.randint(1, 100))]
+        check_plan(lengths, 64)
+
+
+def test_plan_sub_batches_oversize_text_is_alone(monkeypatch):
+    monkeypatch.setattr(main, "TOKEN_BUDGET", 10)
+    
+    sub_batches = main.plan_sub_batches([3, 50, 2])
+    
+    assert [1] in sub_batches
+    check_plan([3, 50, 2], 10)
+
+
+class FakeTokenizer:
+    """Token ids encode each text's input position so outputs can be traced."""
+    
+    def __call__(self, texts, truncation, max_length):
+        input_ids = [[i + 1] * len(text.split()) for i, text in enumerate(texts)]
+        return {
+            "input_ids": input_ids,
+            "attention_mask": [[1] * len(ids) for ids in input_ids],
+        }
+    
+    def pad(self, features, return_tensors):
+        longest = max(len(ids) for ids in features["input_ids"])
+        return {
+            key: torch.tensor([row + [0] * (longest - len(row)) for row in values])
+            for key, values in features.items()
+        }
+
+
+class FakeEncoder:
+    """Embedding row = [position + 1, 1, 0, ...] (before normalization)."""
+    
+    tokenizer = FakeTokenizer()
+    max_seq_length = 128
+    
+    def forward(self, features):
+        first_ids = features["input_ids"][:, 0].float()
+        embeddings = torch.zeros(len(first_ids), main.EMBEDDING_DIMENSION)
+        embeddings[:, 0] = first_ids
+        embeddings[:, 1] = 1.0
+        return {"sentence_embedding": embeddings}
+
+
+def test_encode_texts_returns_rows_in_input_order(monkeypatch):
+    monkeypatch.setitem(main.ml_models, "encoder", FakeEncoder())
+    monkeypatch.setattr(main, "TOKEN_BUDGET", 8)
+    texts = ["a", "a b c d e", "a b", "a b c d e f g", "a b c"]
+    
+    vectors = main.encode_texts(texts)
+    
+    assert vectors.shape == (len(texts), main.EMBEDDING_DIMENSION)
+    # Normalization keeps the ratio, which recovers each row's input position
+    positions = np.rint(vectors[:, 0] / vectors[:, 1]) - 1
+    assert positions.tolist() == list(range(len(texts)))
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-6)
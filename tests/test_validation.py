@@ -0,0 +1,32 @@
+"""
+Empty-text error contract: clients rely on 400 + the original messages.
+
+TestClient is used without a context manager, so lifespan (model load)
+never runs; validation errors are produced before any handler is reached.
+"""
+
+from fastapi.testclient import TestClient
+
+from main import app
+
+client = TestClient(app)
+
+
+def test_whitespace_text_returns_400():
+    response = client.post("/vectorize", json={"text": "   "})
+    
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Text cannot be empty or whitespace only"}
+
+
+def test_whitespace_batch_item_returns_400_with_index():
+    response = client.post("/vectorize/batch", json={"texts": ["a", " "]})
+    
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Item at index 1 is empty.")
+
+
+def test_empty_batch_returns_422():
+    response = client.post("/vectorize/batch", json={"texts": []})
+    
+    assert response.status_code == 422